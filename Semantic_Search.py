@@ -1,20 +1,149 @@
-import json
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+import sklearn
 import pandas as pd
 from typing import List, Dict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import hashlib
+import joblib
+import os
+import pickle
 import re
 import warnings
+from json_io import read_json, write_json
 warnings.filterwarnings('ignore')
 
+try:
+    import faiss
+except ImportError:  # FAISS est optionnel : recherche exhaustive sinon
+    faiss = None
+
+try:
+    import numba
+    from numba import njit, prange
+except ImportError:  # Numba est optionnel : produit matrice-vecteur NumPy sinon
+    numba = None
+
+SVD_COMPONENTS = 128      # Dimensions des embeddings après réduction LSA (TruncatedSVD)
+MIN_SIMILARITY = 1e-4     # Seuil de pertinence (absorbe le bruit numérique float32 de la LSA)
+
+# Paramètres de l'index approximatif (ANN) FAISS IVF+PQ
+ANN_MIN_PRODUCTS = 5000   # En dessous, la recherche exhaustive reste plus rapide
+ANN_PQ_SUBVECTORS = 16    # Nombre de sous-vecteurs du product quantizer
+ANN_PQ_BITS = 8           # Bits par code du product quantizer
+ANN_NPROBE = 8            # Nombre de listes inversées visitées par requête
+ANN_PQ_MIN_TRAINING = 39 * 2 ** ANN_PQ_BITS  # Points requis par FAISS pour entraîner les codebooks PQ
+
+RERANK_CANDIDATES = 10    # Candidats approximatifs (FAISS, int8) par résultat, re-classés exactement
+QUANTIZATION_SCALE = 127  # Échelle int8 des embeddings normalisés (cosinus dans [-1, 1])
+
+QUERY_CACHE_SIZE = 1024   # Nombre de requêtes vectorisées gardées en cache
+
+CACHE_DIR = Path('.cache')  # Modèles et embeddings persistés, indexés par empreinte du catalogue
+_CACHE_FILE = re.compile(r'^[0-9a-f]{32}\.(joblib|npy|i8\.npy|faiss)(\.tmp)?$')
+
+# Motifs de prétraitement compilés une seule fois
+_NON_ALPHA = re.compile(r'[^a-z\s]')
+_MULTI_WS = re.compile(r'\s+')
+
+PREPROCESS_PARALLEL_MIN = 100000  # En dessous, le lancement des processus coûte plus qu'il ne rapporte
+PREPROCESS_CHUNK_SIZE = 1024      # Titres envoyés à un processus à la fois
+
+
+def _preprocess_text(text):
+    """Prétraite un texte (fonction de module, sérialisable pour les processus)"""
+    if not isinstance(text, str):
+        return ""
+    
+    # Convertir en minuscules
+    text = text.lower()
+    # Supprimer les caractères spéciaux sauf les espaces
+    text = _NON_ALPHA.sub('', text)
+    # Supprimer les espaces multiples
+    text = _MULTI_WS.sub(' ', text).strip()
+    
+    return text
+
+
+def top_k_indices(similarities, top_k):
+    """Indices des top-k similarités, triés par ordre décroissant (sélection partielle)"""
+    k = min(top_k, len(similarities))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    part = np.argpartition(similarities, -k)[-k:]
+    return part[np.argsort(similarities[part])[::-1]]
+
+
+if numba is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_kernel(embeddings, query):
+        """Produit matrice dense (N, D) x vecteur (D,), parallélisé sur les lignes"""
+        n_rows, n_dims = embeddings.shape
+        scores = np.empty(n_rows, dtype=np.float32)
+        for i in prange(n_rows):
+            acc = np.float32(0.0)
+            for j in range(n_dims):
+                acc += embeddings[i, j] * query[j]
+            scores[i] = acc
+        return scores
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _int8_dot_kernel(embeddings, query):
+        """Produit matrice int8 (N, D) x vecteur int8 (D,), accumulation en int32"""
+        n_rows, n_dims = embeddings.shape
+        scores = np.empty(n_rows, dtype=np.int32)
+        for i in prange(n_rows):
+            acc = np.int32(0)
+            for j in range(n_dims):
+                acc += np.int32(embeddings[i, j]) * np.int32(query[j])
+            scores[i] = acc
+        return scores
+
+# Sur un seul thread, le GEMV BLAS de NumPy reste plus rapide que le noyau Numba
+USE_NUMBA = numba is not None and numba.config.NUMBA_NUM_THREADS > 1
+
+
+def quantize_int8(vectors):
+    """Quantifie des vecteurs normalisés L2 en int8 (échelle 127)"""
+    scaled = np.rint(vectors * QUANTIZATION_SCALE)
+    return np.clip(scaled, -QUANTIZATION_SCALE, QUANTIZATION_SCALE).astype(np.int8)
+
+
+def cosine_scores(vector, embeddings):
+    """Similarité cosinus entre un vecteur et des embeddings, tous normalisés L2"""
+    query = np.ascontiguousarray(vector, dtype=np.float32).ravel()
+    if USE_NUMBA:
+        return _dot_kernel(np.ascontiguousarray(embeddings), query)
+    return embeddings @ query
+
+
+def _atomic_write(path, write):
+    """Écrit via un fichier temporaire puis os.replace: jamais de fichier de cache à moitié écrit"""
+    tmp = path.with_name(f'{path.name}.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _save_npy(path, array):
+    """np.save vers un chemin exact (sans ajout automatique de l'extension .npy)"""
+    with open(path, 'wb') as f:
+        np.save(f, array)
+
 class SemanticSearcher:
     """Classe pour effectuer une recherche sémantique avec Scikit-learn et TF-IDF"""
     
     def __init__(self):
         """Initialise le searcher avec TF-IDF"""
         print(f"📦 Initialisation du moteur de recherche sémantique")
-        print("   Utilisant TF-IDF + Similarité Cosinus\n")
+        print("   Utilisant TF-IDF + LSA + Similarité Cosinus\n")
         
         self.vectorizer = TfidfVectorizer(
             max_features=5000,
@@ -22,13 +151,25 @@ class SemanticSearcher:
             stop_words='english',
             ngram_range=(1, 2),
             min_df=1,
-            max_df=0.9
+            max_df=0.9,
+            dtype=np.float32
         )
         
         self.products = []
+        self.json_file = None
         self.embeddings = None
+        self.embeddings_i8 = None
+        self.svd = None
+        self.index = None
         self.df = None
         self.titles = []
+        self._titles_arr = None
+        self._prices_arr = None
+        self._images_arr = None
+        self._cat_index = None
+        
+        # Cache LRU des requêtes vectorisées (clé: requête prétraitée)
+        self._embed_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._vectorize_query)
         
         print(f"✅ Moteur de recherche initialisé avec succès\n")
     
@@ -37,51 +178,231 @@ class SemanticSearcher:
         print(f"📂 Chargement des produits depuis {json_file}...")
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                self.products = json.load(f)
+            self.products = read_json(json_file)
+            self.json_file = json_file
             
             self.titles = [p.get('title', '') for p in self.products]
+            # Colonnes en tableaux objet: les résultats s'extraient par indexation NumPy
+            self._titles_arr = np.array(self.titles, dtype=object)
+            self._prices_arr = np.array([p.get('price', '') for p in self.products], dtype=object)
+            self._images_arr = np.array([p.get('image', '') for p in self.products], dtype=object)
             print(f"✅ {len(self.products)} produits chargés\n")
-            return True
         except FileNotFoundError:
             print(f"❌ Fichier {json_file} non trouvé\n")
             return False
+        
+        self.load_categories()
+        return True
+    
+    def load_categories(self, clean_file='produits_marjane_clean'):
+        """Charge une seule fois l'index catégorie -> indices des produits"""
+        # Parquet (rapide, typé) en priorité, CSV sinon
+        try:
+            df = pd.read_parquet(f'{clean_file}.parquet', columns=['categorie'])
+        except (FileNotFoundError, ImportError):
+            try:
+                df = pd.read_csv(f'{clean_file}.csv', usecols=['categorie'])
+            except FileNotFoundError:
+                self._cat_index = None
+                return False
+        
+        self._cat_index = df.groupby('categorie', observed=True).indices
+        return True
     
     def preprocess_text(self, text):
         """Prétraite le texte"""
-        if not isinstance(text, str):
-            return ""
-        
-        # Convertir en minuscules
-        text = text.lower()
-        # Supprimer les caractères spéciaux sauf les espaces
-        text = re.sub(r'[^a-z\s]', '', text)
-        # Supprimer les espaces multiples
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return _preprocess_text(text)
+    
+    def preprocess_titles(self, titles):
+        """Prétraite une liste de textes, en parallèle sur plusieurs processus pour les grands catalogues"""
+        n_workers = os.cpu_count() or 1
+        if len(titles) < PREPROCESS_PARALLEL_MIN or n_workers < 2:
+            return [_preprocess_text(title) for title in titles]
+        
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(_preprocess_text, titles, chunksize=PREPROCESS_CHUNK_SIZE))
+    
+    def _vectorize_query(self, processed_query):
+        """Vectorise une requête prétraitée (appelé via le cache _embed_query)"""
+        query_embedding = self.svd.transform(self.vectorizer.transform([processed_query]))
+        return normalize(query_embedding.astype(np.float32), norm='l2', copy=False)
     
     def generate_embeddings(self):
-        """Génère les embeddings TF-IDF pour tous les produits"""
+        """Génère les embeddings TF-IDF + LSA pour tous les produits"""
         if not self.products:
             print("❌ Aucun produit chargé")
             return False
         
+        # Catalogue inchangé: recharger les modèles et embeddings au lieu de tout recalculer
+        cache_key = self._cache_key()
+        if cache_key is not None and self._load_cache(cache_key):
+            return True
+        
         print("⚙️  Génération des embeddings TF-IDF...")
         print(f"   Total: {len(self.titles)} produits\n")
         
         # Prétraiter les titres
-        processed_titles = [self.preprocess_text(title) for title in self.titles]
-        
-        # Générer les embeddings TF-IDF
-        self.embeddings = self.vectorizer.fit_transform(processed_titles).toarray()
+        processed_titles = self.preprocess_titles(self.titles)
+        
+        # Générer la matrice TF-IDF (creuse CSR)
+        tfidf = self.vectorizer.fit_transform(processed_titles)
+        
+        # Réduire en embeddings denses de faible dimension (LSA)
+        n_components = min(SVD_COMPONENTS, *tfidf.shape)
+        self.svd = TruncatedSVD(n_components=n_components, random_state=0)
+        self.embeddings = self.svd.fit_transform(tfidf).astype(np.float32)
+        # Normaliser les lignes une fois: la similarité cosinus devient un produit scalaire
+        self.embeddings = normalize(self.embeddings, norm='l2', copy=False)
+        # Copie int8 pour le balayage complet: 4x moins d'octets lus par requête.
+        # Sans Numba, NumPy devrait repasser en int32 et perdrait ce gain.
+        self.embeddings_i8 = quantize_int8(self.embeddings) if numba is not None else None
+        # Le vocabulaire a changé: invalider les requêtes en cache
+        self._embed_query.cache_clear()
         
         print(f"✅ Embeddings générés avec succès")
         print(f"   Forme: {self.embeddings.shape}")
-        print(f"   Vocabulaire: {len(self.vectorizer.get_feature_names_out())} termes\n")
+        print(f"   Vocabulaire: {len(self.vectorizer.get_feature_names_out())} termes")
+        print(f"   Variance expliquée (LSA): {self.svd.explained_variance_ratio_.sum() * 100:.1f}%\n")
+        
+        self.build_ann_index()
+        
+        if cache_key is not None:
+            self._save_cache(cache_key)
         
         return True
     
+    def _cache_key(self):
+        """Empreinte BLAKE2b du catalogue chargé et des paramètres d'embedding"""
+        if self.json_file is None:
+            return None
+        try:
+            digest = hashlib.blake2b(Path(self.json_file).read_bytes(), digest_size=16)
+        except FileNotFoundError:
+            return None
+        
+        # Changer un paramètre (embedding, quantification, index ANN) ou une version de
+        # bibliothèque (modèles picklés, format d'index) doit invalider le cache
+        params = (self.vectorizer.get_params(), SVD_COMPONENTS, QUANTIZATION_SCALE,
+                  ANN_MIN_PRODUCTS, ANN_PQ_SUBVECTORS, ANN_PQ_BITS,
+                  sklearn.__version__, np.__version__, faiss.__version__ if faiss is not None else None)
+        digest.update(repr(params).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _load_cache(self, cache_key):
+        """Recharge vectorizer, SVD, embeddings float32/int8 (memory-map) et index FAISS depuis le cache"""
+        models_file = CACHE_DIR / f'{cache_key}.joblib'
+        embeddings_file = CACHE_DIR / f'{cache_key}.npy'
+        embeddings_i8_file = CACHE_DIR / f'{cache_key}.i8.npy'
+        index_file = CACHE_DIR / f'{cache_key}.faiss'
+        if not (models_file.exists() and embeddings_file.exists()):
+            return False
+        
+        # Fichier tronqué ou corrompu: on recalcule plutôt que d'échouer à chaque démarrage
+        try:
+            vectorizer, svd = joblib.load(models_file)
+            embeddings = np.load(embeddings_file, mmap_mode='r')
+            
+            # Copie int8 mappée elle aussi: pas de relecture complète des embeddings au démarrage
+            if numba is None:
+                embeddings_i8 = None
+            elif embeddings_i8_file.exists():
+                embeddings_i8 = np.load(embeddings_i8_file, mmap_mode='r')
+            else:
+                embeddings_i8 = quantize_int8(embeddings)
+            
+            index = None
+            if faiss is not None and index_file.exists():
+                index = faiss.read_index(str(index_file))
+                index.nprobe = ANN_NPROBE
+        except (OSError, ValueError, EOFError, RuntimeError, pickle.UnpicklingError) as e:
+            print(f"⚠️  Cache illisible ({e}), recalcul des embeddings\n")
+            return False
+        
+        self.vectorizer, self.svd = vectorizer, svd
+        self.embeddings, self.embeddings_i8, self.index = embeddings, embeddings_i8, index
+        self._embed_query.cache_clear()
+        
+        print(f"✅ Embeddings chargés depuis le cache ({embeddings_file})")
+        print(f"   Forme: {self.embeddings.shape}\n")
+        
+        # Index absent du cache (FAISS installé depuis, fichier supprimé): le construire une fois
+        if self.index is None and self.build_ann_index():
+            _atomic_write(index_file, lambda path: faiss.write_index(self.index, str(path)))
+        
+        return True
+    
+    def _save_cache(self, cache_key):
+        """Persiste vectorizer, SVD, embeddings et index FAISS pour les prochains lancements"""
+        CACHE_DIR.mkdir(exist_ok=True)
+        
+        # Un seul catalogue en cache: supprimer les fichiers des empreintes précédentes
+        for path in CACHE_DIR.iterdir():
+            if _CACHE_FILE.match(path.name) and not path.name.startswith(f'{cache_key}.'):
+                path.unlink()
+        
+        _atomic_write(CACHE_DIR / f'{cache_key}.joblib',
+                      lambda path: joblib.dump((self.vectorizer, self.svd), path))
+        _atomic_write(CACHE_DIR / f'{cache_key}.npy', lambda path: _save_npy(path, self.embeddings))
+        if self.embeddings_i8 is not None:
+            _atomic_write(CACHE_DIR / f'{cache_key}.i8.npy', lambda path: _save_npy(path, self.embeddings_i8))
+        if self.index is not None:
+            _atomic_write(CACHE_DIR / f'{cache_key}.faiss', lambda path: faiss.write_index(self.index, str(path)))
+    
+    def build_ann_index(self):
+        """Construit un index FAISS IVF+PQ (IVF seul si trop peu de produits) pour les grands catalogues"""
+        self.index = None
+        
+        n_products = self.embeddings.shape[0]
+        if faiss is None or n_products < ANN_MIN_PRODUCTS:
+            return False
+        
+        # Sans assez de points pour les codebooks PQ, les vecteurs sont stockés tels quels
+        vectors = np.ascontiguousarray(self.embeddings)
+        n_components = vectors.shape[1]
+        use_pq = n_components % ANN_PQ_SUBVECTORS == 0 and n_products >= ANN_PQ_MIN_TRAINING
+        print(f"⚙️  Construction de l'index FAISS {'IVF+PQ' if use_pq else 'IVF'}...")
+        
+        # Produit scalaire sur vecteurs normalisés = similarité cosinus
+        n_lists = int(np.sqrt(n_products))
+        quantizer = faiss.IndexFlatIP(n_components)
+        if use_pq:
+            index = faiss.IndexIVFPQ(quantizer, n_components, n_lists,
+                                     ANN_PQ_SUBVECTORS, ANN_PQ_BITS, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, n_components, n_lists, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        index.nprobe = ANN_NPROBE
+        
+        self.index = index
+        print(f"✅ Index construit: {n_lists} listes, {index.ntotal} vecteurs\n")
+        
+        return True
+    
+    def _search_index(self, query_embedding, top_k):
+        """Récupère les candidats via l'index FAISS puis les re-classe par similarité exacte"""
+        query_vector = np.ascontiguousarray(query_embedding)
+        
+        _, candidates = self.index.search(query_vector, top_k * RERANK_CANDIDATES)
+        candidates = candidates[0][candidates[0] >= 0]
+        
+        return self._rerank(query_embedding, candidates, top_k)
+    
+    def _search_quantized(self, query_embedding, top_k):
+        """Balaye les embeddings int8 puis re-classe les meilleurs candidats par similarité exacte"""
+        query_i8 = quantize_int8(query_embedding.ravel())
+        approx_scores = _int8_dot_kernel(self.embeddings_i8, query_i8)
+        candidates = top_k_indices(approx_scores, top_k * RERANK_CANDIDATES)
+        
+        return self._rerank(query_embedding, candidates, top_k)
+    
+    def _rerank(self, query_embedding, candidates, top_k):
+        """Re-score des candidats avec la similarité cosinus exacte (vecteurs float32)"""
+        scores = cosine_scores(query_embedding, self.embeddings[candidates])
+        order = top_k_indices(scores, top_k)
+        
+        return candidates[order], scores[order]
+    
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         Effectue une recherche sémantique
@@ -97,31 +418,47 @@ class SemanticSearcher:
             print("❌ Les embeddings ne sont pas générés")
             return []
         
+        # FAISS refuse k <= 0: même résultat vide que les autres chemins
+        if top_k <= 0:
+            return []
+        
         # Prétraiter et vectoriser la requête
         processed_query = self.preprocess_text(query)
-        query_embedding = self.vectorizer.transform([processed_query]).toarray()
-        
-        # Calculer la similarité cosinus
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        
-        # Obtenir les indices des top-k résultats
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        
-        # Préparer les résultats
-        results = []
-        for idx in top_indices:
-            if similarities[idx] > 0:  # Ignorer les résultats avec similarité 0
-                product = self.products[idx]
-                results.append({
-                    'index': int(idx),
-                    'titre': product.get('title', ''),
-                    'prix': product.get('price', ''),
-                    'image': product.get('image', ''),
-                    'similarite': float(similarities[idx]),
-                    'score_pourcentage': float(similarities[idx] * 100)
-                })
-        
-        return results
+        query_embedding = self._embed_query(processed_query)
+        
+        if self.index is not None:
+            # Recherche approximative via l'index FAISS
+            top_indices, top_scores = self._search_index(query_embedding, top_k)
+        elif self.embeddings_i8 is not None:
+            # Balayage complet quantifié en int8
+            top_indices, top_scores = self._search_quantized(query_embedding, top_k)
+        else:
+            # Similarité cosinus = produit scalaire (vecteurs normalisés)
+            similarities = cosine_scores(query_embedding, self.embeddings)
+            
+            # Obtenir les indices des top-k résultats
+            top_indices = top_k_indices(similarities, top_k)
+            top_scores = similarities[top_indices]
+        
+        # Ignorer les résultats avec similarité nulle
+        keep = np.asarray(top_scores) > MIN_SIMILARITY
+        return self._build_results(np.asarray(top_indices)[keep], np.asarray(top_scores)[keep])
+    
+    def _build_results(self, indices, scores) -> List[Dict]:
+        """Construit les résultats à partir des indices et scores des produits retenus"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return [
+            {
+                'index': int(i),
+                'titre': t,
+                'prix': p,
+                'image': im,
+                'similarite': float(s),
+                'score_pourcentage': float(s * 100)
+            }
+            for i, t, p, im, s in zip(indices, self._titles_arr[indices], self._prices_arr[indices],
+                                      self._images_arr[indices], scores)
+        ]
     
     def display_results(self, results: List[Dict], query: str):
         """Affiche les résultats de la recherche de manière formatée"""
@@ -181,40 +518,25 @@ class SemanticSearcher:
     
     def search_by_category(self, query: str, category: str, top_k: int = 5) -> List[Dict]:
         """Recherche limitée à une catégorie spécifique"""
-        try:
-            df = pd.read_csv('produits_marjane_clean.csv')
-        except FileNotFoundError:
-            print("❌ Fichier produits_marjane_clean.csv non trouvé")
+        if self._cat_index is None and not self.load_categories():
+            print("❌ Fichier produits_marjane_clean.parquet/.csv non trouvé")
             return []
         
-        category_indices = df[df['categorie'] == category].index.tolist()
+        category_indices = self._cat_index.get(category)
         
-        if not category_indices:
+        if category_indices is None or len(category_indices) == 0:
             print(f"❌ Aucun produit trouvé dans la catégorie: {category}")
             return []
         
         processed_query = self.preprocess_text(query)
-        query_embedding = self.vectorizer.transform([processed_query]).toarray()
+        query_embedding = self._embed_query(processed_query)
         
         category_embeddings = self.embeddings[category_indices]
-        similarities = cosine_similarity(query_embedding, category_embeddings)[0]
-        
-        top_local_indices = np.argsort(similarities)[::-1][:top_k]
-        top_global_indices = [category_indices[i] for i in top_local_indices]
+        similarities = cosine_scores(query_embedding, category_embeddings)
         
-        results = []
-        for i, global_idx in enumerate(top_global_indices):
-            product = self.products[global_idx]
-            results.append({
-                'index': int(global_idx),
-                'titre': product.get('title', ''),
-                'prix': product.get('price', ''),
-                'image': product.get('image', ''),
-                'similarite': float(similarities[top_local_indices[i]]),
-                'score_pourcentage': float(similarities[top_local_indices[i]] * 100)
-            })
+        top_local_indices = top_k_indices(similarities, top_k)
         
-        return results
+        return self._build_results(category_indices[top_local_indices], similarities[top_local_indices])
     
     def similar_products(self, product_index: int, top_k: int = 5) -> List[Dict]:
         """Trouve les produits similaires à un produit donné"""
@@ -223,29 +545,44 @@ class SemanticSearcher:
             return []
         
         product_embedding = self.embeddings[product_index:product_index+1]
-        similarities = cosine_similarity(product_embedding, self.embeddings)[0]
+        similarities = cosine_scores(product_embedding, self.embeddings)
         
         similarities[product_index] = -1
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-        
-        results = []
-        for idx in top_indices:
-            product = self.products[idx]
-            results.append({
-                'index': int(idx),
-                'titre': product.get('title', ''),
-                'prix': product.get('price', ''),
-                'image': product.get('image', ''),
-                'similarite': float(similarities[idx]),
-                'score_pourcentage': float(similarities[idx] * 100)
-            })
-        
-        return results
+        top_indices = top_k_indices(similarities, top_k)
+        
+        return self._build_results(top_indices, similarities[top_indices])
+    
+    def similar_products_batch(self, product_indices: List[int], top_k: int = 5) -> Dict[int, List[Dict]]:
+        """Trouve les produits similaires à plusieurs produits en un seul calcul matriciel"""
+        valid_indices = [i for i in product_indices if 0 <= i < len(self.products)]
+        for i in set(product_indices) - set(valid_indices):
+            print(f"❌ Indice de produit invalide: {i}")
+        if not valid_indices:
+            return {}
+        
+        # Embeddings normalisés: une seule multiplication donne toutes les similarités (K x N)
+        rows = np.asarray(valid_indices)
+        similarities = self.embeddings[rows] @ self.embeddings.T
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        
+        # Sélection partielle des top-k par ligne, puis tri de ces k seulement
+        k = min(top_k, similarities.shape[1] - 1)
+        if k <= 0:
+            return {int(i): [] for i in valid_indices}
+        top = np.argpartition(similarities, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(top_scores, axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        
+        return {
+            int(product_index): self._build_results(indices, scores)
+            for product_index, indices, scores in zip(valid_indices, top, top_scores)
+        }
     
     def export_results(self, results: Dict, filename: str = 'search_results.json'):
         """Exporte les résultats en JSON"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        write_json(results, filename)
         print(f"\n✅ Résultats exportés dans {filename}")
 
 def main():
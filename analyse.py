@@ -1,27 +1,64 @@
 import pandas as pd
-import json
 import re
 import numpy as np
 from datetime import datetime
 import warnings
+from json_io import read_json, write_json, write_json_stream
 warnings.filterwarnings('ignore')
 
 class DataAnalyzer:
     """Classe pour le nettoyage et la structuration des données de Marjane"""
     
+    # Motifs compilés une seule fois, appliqués sur des colonnes entières
+    PRICE_DH_PATTERN = re.compile(r'(\d+(?:[,\.]\d+)?)\s*DH', re.IGNORECASE)
+    NUMBER_PATTERN = re.compile(r'(\d+(?:[,\.]\d+)?)')
+    VALID_IMAGE_PATTERN = re.compile(r'cloudinary\.com|marjane\.ma', re.IGNORECASE)
+    DOMAIN_PATTERN = re.compile(r'https?://(?:www\.)?([^/]+)')
+    BRAND_PATTERN = re.compile(r'-\s*([A-Z][A-Z\s&\']+)$')
+    SIZE_PATTERNS = [
+        re.compile(r'(\d+\s*(?:ml|l|g|kg|cm|pouces|x))', re.IGNORECASE),
+        re.compile(r'(\d+\s*(?:pièces|pieces|pack))', re.IGNORECASE),
+    ]
+    
+    # Mots-clés par catégorie, par ordre de priorité
+    CATEGORIES = {
+        'Électronique': ['téléviseur', 'tv', 'écran', 'hisense', 'samsung', 'lg'],
+        'Alimentaire': ['chocolat', 'biscuit', 'lait', 'eau', 'jus', 'huile', 'tomate', 'safran'],
+        'Hygiène & Beauté': ['shampoing', 'savon', 'crème', 'déodorant', 'dentifrice'],
+        'Maison & Nettoyage': ['lessive', 'assouplissant', 'nettoyage', 'détergent', 'fairy'],
+        'Sport & Supporters': ['drapeau', 'vuvuzela', 'mug', 'can', 'maroc'],
+        'Fêtes & Occasions': ['bûche', 'calendrier', 'bonbon', 'cadeau']
+    }
+    
+    # Colonnes stockées en type catégoriel
+    CATEGORICAL_COLUMNS = ['categorie', 'type_promotion', 'image_domaine', 'marque']
+    
+    # Colonnes exportées dans le JSON structuré
+    JSON_COLUMNS = [
+        'title', 'prix_principal', 'prix_reduit', 'pourcentage_remise',
+        'image', 'image_valide', 'image_domaine', 'marque', 'categorie',
+        'taille_quantite', 'en_promotion', 'type_promotion', 'longueur_titre'
+    ]
+    
+    JSON_CHUNK_SIZE = 10000  # Lignes converties en dictionnaires à la fois
+    
     def __init__(self, json_file='produits_marjane.json'):
         """Initialise l'analyseur avec les données"""
         self.json_file = json_file
         self.df = None
         self.data_cleaned = None
+        # Une alternation compilée par catégorie
+        self._cat_patterns = [
+            (category, re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE))
+            for category, keywords in self.CATEGORIES.items()
+        ]
         self.load_data()
     
     def load_data(self):
         """Charge les données depuis le fichier JSON"""
         print("📂 Chargement des données...")
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = read_json(self.json_file)
             self.df = pd.DataFrame(data)
             print(f"✅ {len(self.df)} produits chargés avec succès\n")
         except FileNotFoundError:
@@ -48,7 +85,6 @@ class DataAnalyzer:
         print("1️⃣  NETTOYAGE DES TITRES")
         print(f"{'─'*80}")
         
-        df['title_original'] = df['title']
         # Supprimer les espaces inutiles
         df['title'] = df['title'].str.strip()
         # Normaliser les espaces multiples
@@ -64,16 +100,14 @@ class DataAnalyzer:
         print("2️⃣  NETTOYAGE DES PRIX")
         print(f"{'─'*80}")
         
-        df['price_original'] = df['price']
-        
         # Extraire le prix principal
-        df['prix_principal'] = df['price'].apply(self.extract_main_price)
+        df['prix_principal'] = self.extract_main_price(df['price'])
         
         # Extraire le prix réduit (s'il existe)
-        df['prix_reduit'] = df['price'].apply(self.extract_reduced_price)
+        df['prix_reduit'] = self.extract_reduced_price(df['price'])
         
         # Calculer la remise en pourcentage
-        df['pourcentage_remise'] = df.apply(self.calculate_discount, axis=1)
+        df['pourcentage_remise'] = self.calculate_discount(df['prix_principal'], df['prix_reduit'])
         
         # Vérifier les prix valides
         valid_prices = df['prix_principal'].notna().sum()
@@ -86,13 +120,11 @@ class DataAnalyzer:
         print("3️⃣  NETTOYAGE DES URLS D'IMAGES")
         print(f"{'─'*80}")
         
-        df['image_original'] = df['image']
-        
         # Vérifier la validité des URLs d'images
-        df['image_valide'] = df['image'].apply(self.validate_image_url)
+        df['image_valide'] = self.validate_image_url(df['image'])
         
         # Extraire le domaine de l'image
-        df['image_domaine'] = df['image'].apply(self.extract_domain)
+        df['image_domaine'] = self.extract_domain(df['image'])
         
         image_count = df['image_valide'].sum()
         print(f"✅ URLs d'images valides: {image_count}/{len(df)}")
@@ -104,13 +136,13 @@ class DataAnalyzer:
         print(f"{'─'*80}")
         
         # Extraire la marque
-        df['marque'] = df['title'].apply(self.extract_brand)
+        df['marque'] = self.extract_brand(df['title'])
         
         # Extraire la catégorie
-        df['categorie'] = df['title'].apply(self.categorize_product)
+        df['categorie'] = self.categorize_product(df['title'])
         
         # Extraire la taille/quantité
-        df['taille_quantite'] = df['title'].apply(self.extract_size)
+        df['taille_quantite'] = self.extract_size(df['title'])
         
         # Détecter les promotions
         df['en_promotion'] = df['price'].str.lower().str.contains(
@@ -120,7 +152,7 @@ class DataAnalyzer:
         )
         
         # Extraire le type de promotion
-        df['type_promotion'] = df['price'].apply(self.extract_promotion_type)
+        df['type_promotion'] = self.extract_promotion_type(df['price'])
         
         print(f"✅ Marques extraites: {df['marque'].nunique()} uniques")
         print(f"✅ Catégories détectées: {df['categorie'].nunique()} uniques")
@@ -199,138 +231,134 @@ class DataAnalyzer:
         if anomalies == 0:
             print("✅ Aucune anomalie détectée!")
         
+        # Colonnes à faible cardinalité en type catégoriel (mémoire réduite)
+        for col in self.CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype('category')
+        
         self.data_cleaned = df
         return df
     
-    def extract_main_price(self, price_str):
+    @staticmethod
+    def _to_float(numbers):
+        """Convertit des nombres extraits (virgule décimale) en float"""
+        # Series.replace plutôt que .str: la colonne peut être entièrement NaN (dtype float)
+        return pd.to_numeric(numbers.replace(',', '.', regex=True), errors='coerce')
+    
+    def extract_main_price(self, prices):
         """Extrait le prix principal"""
-        if not price_str or not isinstance(price_str, str):
-            return None
-        
-        # Chercher le premier nombre avec DH
-        match = re.search(r'(\d+(?:[,\.]\d+)?)\s*DH', price_str, re.IGNORECASE)
-        if match:
-            return float(match.group(1).replace(',', '.'))
-        
-        # Chercher juste un nombre
-        match = re.search(r'(\d+(?:[,\.]\d+)?)', price_str)
-        if match:
-            return float(match.group(1).replace(',', '.'))
-        
-        return None
+        # Chercher le premier nombre avec DH, sinon juste un nombre
+        main = prices.str.extract(self.PRICE_DH_PATTERN, expand=False)
+        main = main.fillna(prices.str.extract(self.NUMBER_PATTERN, expand=False))
+        return self._to_float(main)
     
-    def extract_reduced_price(self, price_str):
+    def extract_reduced_price(self, prices):
         """Extrait le prix réduit (s'il existe)"""
-        if not price_str or not isinstance(price_str, str):
-            return None
-        
         # Chercher les nombres séparés par un trait ou autre
-        matches = re.findall(r'(\d+(?:[,\.]\d+)?)\s*DH', price_str, re.IGNORECASE)
-        
-        if len(matches) >= 2:
-            return float(matches[-1].replace(',', '.'))
-        
-        return None
+        matches = prices.str.findall(self.PRICE_DH_PATTERN)
+        reduced = matches.str[-1].where(matches.str.len() >= 2)
+        return self._to_float(reduced)
     
-    def calculate_discount(self, row):
+    def calculate_discount(self, main_prices, reduced_prices):
         """Calcule le pourcentage de remise"""
-        if pd.isna(row['prix_principal']) or pd.isna(row['prix_reduit']):
-            return None
+        main = main_prices.to_numpy(dtype=float)
+        reduced = reduced_prices.to_numpy(dtype=float)
         
-        if row['prix_principal'] == 0:
-            return None
+        # Pas de remise si un prix manque ou si le prix principal est nul
+        with np.errstate(invalid='ignore', divide='ignore'):
+            discount = np.where(main != 0, (main - reduced) / main * 100.0, np.nan)
         
-        discount = ((row['prix_principal'] - row['prix_reduit']) / row['prix_principal']) * 100
-        return max(0, min(100, discount))  # Entre 0 et 100%
+        return pd.Series(np.clip(discount, 0, 100), index=main_prices.index)  # Entre 0 et 100%
     
-    def validate_image_url(self, url):
-        """Valide une URL d'image"""
-        if not url or not isinstance(url, str):
-            return False
-        
-        valid_domains = ['cloudinary.com', 'marjane.ma', 'res.cloudinary.com']
-        return any(domain in url.lower() for domain in valid_domains)
+    @staticmethod
+    def _map_unique(values, transform):
+        """Applique une transformation aux seules valeurs distinctes puis la propage"""
+        uniques = pd.Series(values.dropna().unique(), dtype=object)
+        mapping = dict(zip(uniques, transform(uniques)))
+        return values.map(mapping)
     
-    def extract_domain(self, url):
-        """Extrait le domaine de l'image"""
-        if not url or not isinstance(url, str):
-            return 'Inconnu'
-        
-        match = re.search(r'https?://(?:www\.)?([^/]+)', url)
-        if match:
-            return match.group(1)
-        
-        return 'Inconnu'
+    def validate_image_url(self, urls):
+        """Valide les URLs d'images"""
+        # Peu d'URLs distinctes par domaine: valider chaque URL une seule fois
+        valid = self._map_unique(urls, lambda u: u.str.contains(self.VALID_IMAGE_PATTERN, na=False))
+        return valid.fillna(False).astype(bool)
     
-    def extract_brand(self, title):
-        """Extrait la marque du titre"""
-        if not title or not isinstance(title, str):
-            return 'Non spécifié'
-        
+    def extract_domain(self, urls):
+        """Extrait le domaine des images"""
+        domains = self._map_unique(urls, lambda u: u.str.extract(self.DOMAIN_PATTERN, expand=False))
+        return domains.fillna('Inconnu')
+    
+    def extract_brand(self, titles):
+        """Extrait la marque des titres"""
         # Pattern: " - MARQUE" à la fin
-        match = re.search(r'-\s*([A-Z][A-Z\s&\']+)$', title)
-        if match:
-            return match.group(1).strip()
-        
-        return 'Non spécifié'
+        brands = self._map_unique(
+            titles, lambda t: t.str.extract(self.BRAND_PATTERN, expand=False).str.strip()
+        )
+        return brands.fillna('Non spécifié')
     
-    def categorize_product(self, title):
-        """Catégorise le produit"""
-        if not title or not isinstance(title, str):
-            return 'Autre'
-        
-        title_lower = title.lower()
-        
-        categories = {
-            'Électronique': ['téléviseur', 'tv', 'écran', 'hisense', 'samsung', 'lg'],
-            'Alimentaire': ['chocolat', 'biscuit', 'lait', 'eau', 'jus', 'huile', 'tomate', 'safran'],
-            'Hygiène & Beauté': ['shampoing', 'savon', 'crème', 'déodorant', 'dentifrice'],
-            'Maison & Nettoyage': ['lessive', 'assouplissant', 'nettoyage', 'détergent', 'fairy'],
-            'Sport & Supporters': ['drapeau', 'vuvuzela', 'mug', 'can', 'maroc'],
-            'Fêtes & Occasions': ['bûche', 'calendrier', 'bonbon', 'cadeau']
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in title_lower for keyword in keywords):
-                return category
-        
-        return 'Autre'
+    def categorize_product(self, titles):
+        """Catégorise les produits"""
+        # La première catégorie dont un mot-clé apparaît dans le titre l'emporte
+        masks = [titles.str.contains(pattern, na=False) for _, pattern in self._cat_patterns]
+        categories = [category for category, _ in self._cat_patterns]
+        return pd.Series(np.select(masks, categories, default='Autre'), index=titles.index)
     
-    def extract_size(self, title):
-        """Extrait la taille/quantité du produit"""
-        if not title or not isinstance(title, str):
-            return 'Non spécifié'
-        
-        # Chercher les patterns de taille
-        patterns = [
-            r'(\d+\s*(?:ml|l|g|kg|cm|pouces|x))',
-            r'(\d+\s*(?:pièces|pieces|pack))',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        
-        return 'Non spécifié'
+    def extract_size(self, titles):
+        """Extrait la taille/quantité des produits"""
+        # Chercher les patterns de taille, dans l'ordre de priorité
+        sizes = titles.str.extract(self.SIZE_PATTERNS[0], expand=False)
+        for pattern in self.SIZE_PATTERNS[1:]:
+            sizes = sizes.fillna(titles.str.extract(pattern, expand=False))
+        # fillna peut convertir une colonne sans aucune taille en float: revenir en object
+        return sizes.astype(object).str.strip().fillna('Non spécifié')
     
-    def extract_promotion_type(self, price_str):
+    def extract_promotion_type(self, prices):
         """Extrait le type de promotion"""
-        if not price_str or not isinstance(price_str, str):
-            return 'Aucune'
-        
-        price_lower = price_str.lower()
-        
-        if 'remise' in price_lower or '-' in price_str:
-            return 'Remise'
-        elif '%' in price_str:
-            return 'Pourcentage'
-        elif 'achetés' in price_lower:
-            return 'Promotion multi-achat'
-        elif 'offre' in price_lower:
-            return 'Offre spéciale'
-        
-        return 'Aucune'
+        prices_lower = prices.str.lower()
+        conditions = [
+            prices_lower.str.contains('remise', regex=False, na=False)
+            | prices.str.contains('-', regex=False, na=False),
+            prices.str.contains('%', regex=False, na=False),
+            prices_lower.str.contains('achetés', regex=False, na=False),
+            prices_lower.str.contains('offre', regex=False, na=False),
+        ]
+        choices = ['Remise', 'Pourcentage', 'Promotion multi-achat', 'Offre spéciale']
+        return pd.Series(np.select(conditions, choices, default='Aucune'), index=prices.index)
+    
+    def _iter_json_items(self):
+        """Génère les éléments JSON structurés, par lots de lignes"""
+        df = self.data_cleaned[self.JSON_COLUMNS]
+        for start in range(0, len(df), self.JSON_CHUNK_SIZE):
+            chunk = df.iloc[start:start + self.JSON_CHUNK_SIZE]
+            # Dictionnaires simples plutôt qu'iterrows
+            for idx, row in zip(chunk.index, chunk.to_dict(orient='records')):
+                yield self._json_item(idx, row)
+    
+    @staticmethod
+    def _json_item(idx, row):
+        """Transforme une ligne nettoyée en élément JSON structuré"""
+        return {
+            'id': idx + 1,
+            'titre': row['title'],
+            'prix': {
+                'principal': float(row['prix_principal']) if pd.notna(row['prix_principal']) else None,
+                'reduit': float(row['prix_reduit']) if pd.notna(row['prix_reduit']) else None,
+                'remise_pourcentage': float(row['pourcentage_remise']) if pd.notna(row['pourcentage_remise']) else None,
+                'devise': 'DH'
+            },
+            'image': {
+                'url': row['image'],
+                'valide': bool(row['image_valide']),
+                'domaine': row['image_domaine']
+            },
+            'metadata': {
+                'marque': row['marque'],
+                'categorie': row['categorie'],
+                'taille_quantite': row['taille_quantite'],
+                'en_promotion': bool(row['en_promotion']),
+                'type_promotion': row['type_promotion'],
+                'longueur_titre': int(row['longueur_titre'])
+            }
+        }
     
     def save_cleaned_data(self):
         """Sauvegarde les données nettoyées"""
@@ -347,39 +375,16 @@ class DataAnalyzer:
         self.data_cleaned.to_csv(csv_file, index=False, encoding='utf-8')
         print(f"✅ Données nettoyées sauvegardées: {csv_file}")
         
+        # Sauvegarder en Parquet (chargement plus rapide, types conservés)
+        parquet_file = 'produits_marjane_clean.parquet'
+        self.data_cleaned.to_parquet(parquet_file, index=False)
+        print(f"✅ Données nettoyées sauvegardées: {parquet_file}")
+        
         # Sauvegarder en JSON avec structure améliorée
         json_file = 'produits_marjane_analyse.json'
         
-        # Préparer les données pour JSON
-        data_json = []
-        for idx, row in self.data_cleaned.iterrows():
-            item = {
-                'id': idx + 1,
-                'titre': row['title'],
-                'prix': {
-                    'principal': float(row['prix_principal']) if pd.notna(row['prix_principal']) else None,
-                    'reduit': float(row['prix_reduit']) if pd.notna(row['prix_reduit']) else None,
-                    'remise_pourcentage': float(row['pourcentage_remise']) if pd.notna(row['pourcentage_remise']) else None,
-                    'devise': 'DH'
-                },
-                'image': {
-                    'url': row['image'],
-                    'valide': bool(row['image_valide']),
-                    'domaine': row['image_domaine']
-                },
-                'metadata': {
-                    'marque': row['marque'],
-                    'categorie': row['categorie'],
-                    'taille_quantite': row['taille_quantite'],
-                    'en_promotion': bool(row['en_promotion']),
-                    'type_promotion': row['type_promotion'],
-                    'longueur_titre': int(row['longueur_titre'])
-                }
-            }
-            data_json.append(item)
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(data_json, f, ensure_ascii=False, indent=2)
+        # Écrire les éléments au fil de l'eau, sans construire toute la liste en mémoire
+        write_json_stream(self._iter_json_items(), json_file)
         print(f"✅ Données structurées sauvegardées: {json_file}")
         
         # Créer un rapport de nettoyage
@@ -402,8 +407,7 @@ class DataAnalyzer:
         }
         
         report_file = 'rapport_nettoyage.json'
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        write_json(report, report_file)
         print(f"✅ Rapport de nettoyage sauvegardé: {report_file}")
     
     def display_sample(self, n=5):
@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : module json standard sinon
+    orjson = None
+
+def read_json(json_file):
+    """Charge un fichier JSON (parseur C orjson si disponible)"""
+    if orjson is not None:
+        return orjson.loads(Path(json_file).read_bytes())
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dumps_json(data):
+    """Sérialise des données en JSON indenté (octets UTF-8, sans échappement ASCII)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def write_json(data, json_file):
+    """Sauvegarde des données en JSON indenté"""
+    Path(json_file).write_bytes(dumps_json(data))
+
+def write_json_stream(items, json_file):
+    """Écrit une liste JSON élément par élément, sans la construire en mémoire"""
+    with open(json_file, 'wb') as f:
+        f.write(b'[')
+        empty = True
+        for item in items:
+            f.write(b'\n  ' if empty else b',\n  ')
+            # Réindenter l'élément d'un niveau (les chaînes JSON n'ont pas de saut de ligne brut)
+            f.write(dumps_json(item).replace(b'\n', b'\n  '))
+            empty = False
+        f.write(b']' if empty else b'\n]')
@@ -1,67 +1,102 @@
+import numpy as np
 import pandas as pd
 import re
-from collections import Counter
-import json
-from scrap import scrape_data_with_selenium
+from json_io import write_json
+from scrap import scrape_urls
 
-def extract_price_value(price_str):
-    """Extrait la valeur numérique du prix"""
-    if not price_str:
-        return None
-    # Extraire les nombres avec virgules/points
-    match = re.search(r'(\d+(?:[,\.]\d+)?)', price_str)
-    if match:
-        return float(match.group(1).replace(',', '.'))
-    return None
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick est optionnel : un scan regex par catégorie sinon
+    ahocorasick = None
 
-def categorize_product(title):
-    """Catégorise le produit selon son titre"""
-    title_lower = title.lower()
-    
-    categories = {
-        'Électronique': ['téléviseur', 'tv', 'écran', 'hisense', 'samsung', 'lg', 'électroménager'],
-        'Alimentaire': ['chocolat', 'biscuit', 'lait', 'eau', 'jus', 'fromage', 'yaourt', 'huile', 'tomate'],
-        'Hygiène & Beauté': ['shampoing', 'savon', 'crème', 'déodorant', 'dentifrice', 'parfum'],
-        'Maison': ['lessive', 'assouplissant', 'nettoyage', 'détergent', 'fairy', 'tide'],
-        'Sport & Supporters': ['drapeau', 'vuvuzela', 'mug', 'can 2025', 'maroc'],
-        'Fêtes': ['bûche', 'chocolat', 'calendrier', 'bonbon', 'cadeau']
-    }
-    
-    for category, keywords in categories.items():
-        if any(keyword in title_lower for keyword in keywords):
-            return category
+# Pages à scraper (scrapées en parallèle s'il y en a plusieurs: catégories, pagination...)
+URLS = ['https://www.marjane.ma/']
+
+# Motifs compilés une seule fois au chargement du module
+_PRICE_RE = re.compile(r'(\d+(?:[,\.]\d+)?)')
+_BRAND_RE = re.compile(r'-\s*([A-Z][A-Z\s&]+)$')
+_WORD_RE = re.compile(r'\b[a-zàâäéèêëïîôùûüç]{3,}\b')
+_PROMO_RE = re.compile(r'remise|promotion|-|%|achetés', re.IGNORECASE)
+
+# Mots ignorés dans l'analyse des mots-clés (Index: filtrage isin par table de hachage)
+STOP_WORDS = pd.Index(['de', 'la', 'le', 'les', 'et', 'en', 'au', 'du', 'à', 'pour', 'avec', 'x', '-'])
+
+# Mots-clés par catégorie, dans l'ordre de priorité
+CATEGORIES = {
+    'Électronique': ['téléviseur', 'tv', 'écran', 'hisense', 'samsung', 'lg', 'électroménager'],
+    'Alimentaire': ['chocolat', 'biscuit', 'lait', 'eau', 'jus', 'fromage', 'yaourt', 'huile', 'tomate'],
+    'Hygiène & Beauté': ['shampoing', 'savon', 'crème', 'déodorant', 'dentifrice', 'parfum'],
+    'Maison': ['lessive', 'assouplissant', 'nettoyage', 'détergent', 'fairy', 'tide'],
+    'Sport & Supporters': ['drapeau', 'vuvuzela', 'mug', 'can 2025', 'maroc'],
+    'Fêtes': ['bûche', 'chocolat', 'calendrier', 'bonbon', 'cadeau']
+}
+_CATEGORY_PATTERNS = {cat: re.compile('|'.join(map(re.escape, kws))) for cat, kws in CATEGORIES.items()}
+
+def _build_category_automaton():
+    """Compile tous les mots-clés dans un seul automate Aho-Corasick (mot-clé -> code catégorie)"""
+    automaton = ahocorasick.Automaton()
+    for code, keywords in enumerate(CATEGORIES.values()):
+        for keyword in keywords:
+            # Un mot-clé partagé garde la catégorie la plus prioritaire
+            if keyword not in automaton:
+                automaton.add_word(keyword, code)
+    automaton.make_automaton()
+    return automaton
+
+_CATEGORY_AUTOMATON = _build_category_automaton() if ahocorasick is not None else None
+
+def categorize_products(titles):
+    """Catégorise les produits selon leur titre (première catégorie qui correspond)"""
+    titles_lower = titles.str.lower()
+    default = len(CATEGORIES)
+    
+    if _CATEGORY_AUTOMATON is not None:
+        # Un seul passage par titre: la plus petite priorité parmi les mots-clés trouvés
+        codes = np.fromiter(
+            (min((code for _, code in _CATEGORY_AUTOMATON.iter(title)), default=default)
+             for title in titles_lower.fillna('')),
+            dtype=np.int8, count=len(titles_lower)
+        )
+    else:
+        masks = [titles_lower.str.contains(p, regex=True, na=False) for p in _CATEGORY_PATTERNS.values()]
+        codes = np.select(masks, range(len(masks)), default=default)
     
-    return 'Autre'
+    return pd.Categorical.from_codes(codes, categories=list(CATEGORIES) + ['Autre'])
 
-def extract_brand(title):
-    """Extrait la marque du produit"""
-    # Chercher le pattern " - MARQUE" à la fin du titre
-    match = re.search(r'-\s*([A-Z][A-Z\s&]+)$', title)
-    if match:
-        return match.group(1).strip()
-    return 'Non spécifié'
+def to_records(articles):
+    """Reconstruit la liste d'articles {'title', 'price', 'image'} à partir des colonnes du scraper"""
+    return [dict(zip(articles, values)) for values in zip(*articles.values())]
 
 def analyze_data(articles):
-    """Analyse les données des produits"""
-    if not articles:
+    """Analyse les données des produits (colonnes 'title', 'price', 'image' du scraper)"""
+    if not articles or not articles['title']:
         print("Aucune donnée à analyser")
         return
     
-    # Créer un DataFrame
-    df = pd.DataFrame(articles)
+    # Créer un DataFrame à colonnes de chaînes Arrow
+    df = pd.DataFrame(articles).astype({
+        'title': 'string[pyarrow]',
+        'price': 'string[pyarrow]',
+        'image': 'string[pyarrow]'
+    })
     
-    # Extraire les valeurs numériques des prix
-    df['prix_numerique'] = df['price'].apply(extract_price_value)
+    # Extraire les valeurs numériques des prix (nombres avec virgules/points, vectorisé)
+    prices = df['price'].str.extract(_PRICE_RE, expand=False)
+    df['prix_numerique'] = pd.to_numeric(prices.str.replace(',', '.', regex=False), errors='coerce', downcast='float')
     
     # Catégoriser les produits
-    df['categorie'] = df['title'].apply(categorize_product)
+    df['categorie'] = categorize_products(df['title'])
     
-    # Extraire les marques
-    df['marque'] = df['title'].apply(extract_brand)
+    # Extraire les marques (pattern " - MARQUE" à la fin du titre)
+    brands = df['title'].str.extract(_BRAND_RE, expand=False).str.strip()
+    df['marque'] = brands.fillna('Non spécifié').astype('category')
     
     # Filtrer les produits avec prix valides
     df_with_price = df[df['prix_numerique'].notna()]
     
+    # Statistiques de prix calculées en un seul appel (réutilisées par le rapport)
+    price_stats = df_with_price['prix_numerique'].agg(['mean', 'median', 'min', 'max', 'std'])
+    
     print("="*80)
     print("📊 ANALYSE DES DONNÉES - MARJANE.MA")
     print("="*80)
@@ -76,29 +111,35 @@ def analyze_data(articles):
         print("\n" + "="*80)
         print("💵 STATISTIQUES DES PRIX")
         print("="*80)
-        print(f"Prix moyen: {df_with_price['prix_numerique'].mean():.2f} DH")
-        print(f"Prix médian: {df_with_price['prix_numerique'].median():.2f} DH")
-        print(f"Prix minimum: {df_with_price['prix_numerique'].min():.2f} DH")
-        print(f"Prix maximum: {df_with_price['prix_numerique'].max():.2f} DH")
-        print(f"Écart-type: {df_with_price['prix_numerique'].std():.2f} DH")
+        print(f"Prix moyen: {price_stats['mean']:.2f} DH")
+        print(f"Prix médian: {price_stats['median']:.2f} DH")
+        print(f"Prix minimum: {price_stats['min']:.2f} DH")
+        print(f"Prix maximum: {price_stats['max']:.2f} DH")
+        print(f"Écart-type: {price_stats['std']:.2f} DH")
         
         # Produits les plus chers
         print("\n🔝 TOP 5 PRODUITS LES PLUS CHERS:")
         top_expensive = df_with_price.nlargest(5, 'prix_numerique')[['title', 'prix_numerique']]
-        for idx, row in top_expensive.iterrows():
-            print(f"  • {row['title'][:60]}... - {row['prix_numerique']:.2f} DH")
+        for title, price in top_expensive.itertuples(index=False):
+            print(f"  • {title[:60]}... - {price:.2f} DH")
         
         # Produits les moins chers
         print("\n💡 TOP 5 PRODUITS LES MOINS CHERS:")
         top_cheap = df_with_price.nsmallest(5, 'prix_numerique')[['title', 'prix_numerique']]
-        for idx, row in top_cheap.iterrows():
-            print(f"  • {row['title'][:60]}... - {row['prix_numerique']:.2f} DH")
+        for title, price in top_cheap.itertuples(index=False):
+            print(f"  • {title[:60]}... - {price:.2f} DH")
     
     # Analyse par catégorie
     print("\n" + "="*80)
     print("📦 RÉPARTITION PAR CATÉGORIE")
     print("="*80)
-    category_counts = df['categorie'].value_counts()
+    # Un seul groupby pour les effectifs et les prix moyens par catégorie
+    category_stats = df.groupby('categorie', observed=True).agg(
+        total=('title', 'size'),
+        mean_price=('prix_numerique', 'mean'),
+        priced=('prix_numerique', 'count')
+    )
+    category_counts = category_stats['total'].sort_values(ascending=False, kind='stable')
     for category, count in category_counts.items():
         percentage = (count / len(df)) * 100
         print(f"{category:20s}: {count:3d} produits ({percentage:.1f}%)")
@@ -106,11 +147,10 @@ def analyze_data(articles):
     # Prix moyen par catégorie
     if len(df_with_price) > 0:
         print("\n💰 PRIX MOYEN PAR CATÉGORIE:")
-        category_avg = df_with_price.groupby('categorie')['prix_numerique'].agg(['mean', 'count'])
-        category_avg = category_avg.sort_values('mean', ascending=False)
-        for category, row in category_avg.iterrows():
-            if row['count'] > 0:
-                print(f"{category:20s}: {row['mean']:7.2f} DH (basé sur {int(row['count'])} produits)")
+        category_avg = category_stats.dropna(subset=['mean_price']).sort_values('mean_price', ascending=False)
+        for category, mean_price, priced in category_avg[['mean_price', 'priced']].itertuples():
+            if priced > 0:
+                print(f"{category:20s}: {mean_price:7.2f} DH (basé sur {int(priced)} produits)")
     
     # Analyse des marques
     print("\n" + "="*80)
@@ -126,31 +166,29 @@ def analyze_data(articles):
     print("\n" + "="*80)
     print("🎁 DÉTECTION DES PROMOTIONS")
     print("="*80)
-    promo_keywords = ['remise', 'promotion', '-', '%', 'achetés']
-    df['has_promo'] = df['price'].str.lower().str.contains('|'.join(promo_keywords), na=False)
+    # Prix en minuscules calculés une seule fois, réutilisables pour d'autres indicateurs
+    price_lower = df['price'].fillna('').str.lower()
+    df['has_promo'] = price_lower.str.contains(_PROMO_RE, regex=True, na=False)
     promo_count = df['has_promo'].sum()
     print(f"Produits en promotion détectés: {promo_count} ({(promo_count/len(df)*100):.1f}%)")
     
     if promo_count > 0:
         print("\n🔥 QUELQUES PRODUITS EN PROMOTION:")
-        promo_products = df[df['has_promo']].head(5)
-        for idx, row in promo_products.iterrows():
-            print(f"  • {row['title'][:60]}")
-            print(f"    Prix: {row['price'][:80]}")
+        promo_products = df.loc[df['has_promo'], ['title', 'price']].head(5)
+        for title, price in promo_products.itertuples(index=False):
+            print(f"  • {title[:60]}")
+            print(f"    Prix: {price[:80]}")
     
     # Analyse des mots-clés dans les titres
     print("\n" + "="*80)
     print("🔍 MOTS-CLÉS LES PLUS FRÉQUENTS DANS LES TITRES")
     print("="*80)
-    # Extraire tous les mots des titres
-    all_words = []
-    stop_words = {'de', 'la', 'le', 'les', 'et', 'en', 'au', 'du', 'à', 'pour', 'avec', 'x', '-'}
-    for title in df['title']:
-        words = re.findall(r'\b[a-zàâäéèêëïîôùûüç]{3,}\b', title.lower())
-        all_words.extend([w for w in words if w not in stop_words])
-    
-    word_freq = Counter(all_words).most_common(15)
-    for word, count in word_freq:
+    # Extraire tous les mots des titres (un mot par ligne après explode)
+    words = df['title'].str.lower().str.findall(_WORD_RE).explode().dropna()
+    
+    # Tri stable: à égalité, ordre de première apparition (comme Counter.most_common)
+    word_freq = words[~words.isin(STOP_WORDS)].value_counts(sort=False).sort_values(ascending=False, kind='stable').head(15)
+    for word, count in word_freq.items():
         print(f"{word:15s}: {count:3d} occurrences")
     
     # Sauvegarder les résultats
@@ -162,25 +200,27 @@ def analyze_data(articles):
     df.to_csv('produits_marjane.csv', index=False, encoding='utf-8')
     print("✅ Données sauvegardées dans 'produits_marjane.csv'")
     
-    # Sauvegarder en JSON
-    with open('produits_marjane.json', 'w', encoding='utf-8') as f:
-        json.dump(articles, f, ensure_ascii=False, indent=2)
+    # Sauvegarder en Parquet (colonnes Arrow écrites sans conversion, compression snappy)
+    df.to_parquet('produits_marjane.parquet', index=False, compression='snappy')
+    print("✅ Données sauvegardées dans 'produits_marjane.parquet'")
+    
+    # Sauvegarder en JSON (liste d'articles, format attendu par analyse.py et Semantic_Search.py)
+    write_json(to_records(articles), 'produits_marjane.json')
     print("✅ Données sauvegardées dans 'produits_marjane.json'")
     
     # Créer un rapport d'analyse
     report = {
         'nombre_produits': len(df),
         'produits_avec_prix': len(df_with_price),
-        'prix_moyen': float(df_with_price['prix_numerique'].mean()) if len(df_with_price) > 0 else 0,
-        'prix_min': float(df_with_price['prix_numerique'].min()) if len(df_with_price) > 0 else 0,
-        'prix_max': float(df_with_price['prix_numerique'].max()) if len(df_with_price) > 0 else 0,
+        'prix_moyen': float(price_stats['mean']) if len(df_with_price) > 0 else 0,
+        'prix_min': float(price_stats['min']) if len(df_with_price) > 0 else 0,
+        'prix_max': float(price_stats['max']) if len(df_with_price) > 0 else 0,
         'categories': category_counts.to_dict(),
         'top_marques': brand_counts.head(5).to_dict(),
         'produits_en_promotion': int(promo_count)
     }
     
-    with open('analyse_rapport.json', 'w', encoding='utf-8') as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    write_json(report, 'analyse_rapport.json')
     print("✅ Rapport d'analyse sauvegardé dans 'analyse_rapport.json'")
     
     print("\n" + "="*80)
@@ -194,10 +234,10 @@ def main():
     print("🚀 Démarrage du scraping de Marjane.ma...")
     
     # Scraper les données
-    articles = scrape_data_with_selenium('https://www.marjane.ma/')
+    articles = scrape_urls(URLS)
     
     # Analyser les données
-    if articles:
+    if articles['title']:
         analyze_data(articles)
     else:
         print("❌ Aucune donnée n'a pu être extraite.")
@@ -1,14 +1,52 @@
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+import re
 import time
 
-def scrape_data_with_selenium(url):
-    """Scraping avec Selenium pour les sites JavaScript"""
+# Motifs de classes CSS compilés une fois: plus de lambda ni de str(x).lower() par élément (BeautifulSoup appelle toujours .search)
+_PRODUCT_CLASS_RE = re.compile(r'product|card|item', re.IGNORECASE)
+_TITLE_CLASS_RE = re.compile(r'title|name|label', re.IGNORECASE)
+_PRICE_CLASS_RE = re.compile(r'price', re.IGNORECASE)
+
+# Images ignorées (logos, icônes, SVG)
+_IMG_SKIP_RE = re.compile(r'logo|icon|svg', re.IGNORECASE)
+
+SCRAPE_MAX_WORKERS = 4  # Navigateurs Chrome lancés en parallèle au maximum
+PAGE_LOAD_TIMEOUT = 15  # Attente maximale (s) de l'apparition d'un produit
+PAGE_LOAD_FALLBACK_SLEEP = 2  # Pause (s) si aucun produit n'apparaît (challenge Cloudflare)
+
+# Page prête: un produit hors menu/en-tête/pied de page avec son prix, comme l'exige l'extraction
+# (sélecteurs insensibles à la casse, comme _PRODUCT_CLASS_RE et _PRICE_CLASS_RE)
+_PRODUCTS_READY_SCRIPT = """
+return Array.from(document.querySelectorAll('div[class*="product" i], a[class*="product" i]')).some(
+    el => !el.closest('nav, header, footer')
+        && el.querySelector('span[class*="price" i], div[class*="price" i], p[class*="price" i]') !== null
+);
+"""
+
+def _products_loaded(driver):
+    """Condition WebDriverWait: vrai dès qu'un produit exploitable est dans le DOM"""
+    return bool(driver.execute_script(_PRODUCTS_READY_SCRIPT))
+
+# Variantes du scraper simple (requests)
+_SIMPLE_PRODUCT_CLASS_RE = re.compile(r'product|item', re.IGNORECASE)
+_SIMPLE_TITLE_CLASS_RE = re.compile(r'title|name', re.IGNORECASE)
+
+def _save_page_source(page_source, page_file):
+    """Sauvegarde le HTML brut de la page pour déboguer"""
+    with open(page_file, 'w', encoding='utf-8') as f:
+        f.write(page_source)
+    print(f"HTML sauvegardé dans {page_file}")
+
+def scrape_data_with_selenium(url, debug=False, page_file='page_source.html'):
+    """Scraping avec Selenium pour les sites JavaScript (debug=True sauvegarde toujours le HTML brut)"""
     options = Options()
     options.add_argument('--headless')  # Mode sans interface graphique
     options.add_argument('--no-sandbox')
@@ -18,33 +56,35 @@ def scrape_data_with_selenium(url):
     options.add_experimental_option('useAutomationExtension', False)
     options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
     
+    driver = None
+    page_source = None
     try:
         driver = webdriver.Chrome(options=options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         driver.get(url)
         
-        # Attendre plus longtemps pour Cloudflare
+        # Attendre l'apparition d'un produit (Cloudflare compris) plutôt qu'une durée fixe
         print("Attente du chargement de la page...")
-        time.sleep(10)
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        try:
+            # Script interrompu pendant un rechargement (challenge Cloudflare): continuer d'attendre
+            WebDriverWait(driver, PAGE_LOAD_TIMEOUT, ignored_exceptions=(JavascriptException,)).until(_products_loaded)
+        except WebDriverException:  # Délai dépassé (TimeoutException) ou navigateur indisponible
+            time.sleep(PAGE_LOAD_FALLBACK_SLEEP)
         
-        # Sauvegarder le HTML pour déboguer
-        with open('page_source.html', 'w', encoding='utf-8') as f:
-            f.write(soup.prettify())
-        print("HTML sauvegardé dans page_source.html")
+        page_source = driver.page_source
+        soup = BeautifulSoup(page_source, 'lxml')
         
-        driver.quit()
-        
-        articles = []
+        # Une liste par colonne plutôt qu'un dict par article
+        titles, prices, images = [], [], []
+        seen = set()  # (titre, prix) déjà extraits: un <a> et son <div> produit se recoupent
         
         # Méthode 1: Chercher les produits dans des divs ou liens qui contiennent des éléments de produit typiques
-        for item in soup.find_all(['div', 'a'], class_=lambda x: x and any(word in str(x).lower() for word in ['product', 'card', 'item'])):
+        for item in soup.find_all(['div', 'a'], class_=_PRODUCT_CLASS_RE):
             # Ignorer les éléments du menu et de navigation
             if item.find_parent(['nav', 'header', 'footer']):
                 continue
                 
-            title_elem = item.find(['h2', 'h3', 'h4', 'span'], class_=lambda x: x and any(word in str(x).lower() for word in ['title', 'name', 'label']))
+            title_elem = item.find(['h2', 'h3', 'h4', 'span'], class_=_TITLE_CLASS_RE)
             title = title_elem.get_text(strip=True) if title_elem else ""
             
             # Ne garder que les titres valides (pas trop courts, pas trop longs)
@@ -52,7 +92,7 @@ def scrape_data_with_selenium(url):
                 continue
             
             # Chercher le prix
-            price_elem = item.find(['span', 'div', 'p'], class_=lambda x: x and 'price' in str(x).lower())
+            price_elem = item.find(['span', 'div', 'p'], class_=_PRICE_CLASS_RE)
             price = price_elem.get_text(strip=True) if price_elem else ""
             
             # Chercher l'image
@@ -62,38 +102,79 @@ def scrape_data_with_selenium(url):
                 image_url = img.get('src', '') or img.get('data-src', '') or img.get('data-lazy-src', '')
             
             # Ne garder que les éléments qui ont un prix ou une image de produit valide
-            if (price and 'DH' in price.upper()) or (image_url and not any(x in image_url.lower() for x in ['logo', 'icon', 'svg'])):
-                articles.append({
-                    'title': title,
-                    'price': price,
-                    'image': image_url
-                })
+            if (price and 'DH' in price.upper()) or (image_url and not _IMG_SKIP_RE.search(image_url)):
+                key = (title, price)
+                if key in seen:
+                    continue
+                seen.add(key)
+                titles.append(title)
+                prices.append(price)
+                images.append(image_url)
+        
+        # HTML conservé seulement s'il faut comprendre pourquoi rien n'a été extrait
+        if debug or not titles:
+            _save_page_source(page_source, page_file)
         
-        return articles
+        return {'title': titles, 'price': prices, 'image': images}
     except Exception as e:
         print(f"Erreur Selenium: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        if page_source is not None:
+            _save_page_source(page_source, page_file)
+        return {'title': [], 'price': [], 'image': []}
+    finally:
+        # Fermer Chrome même en cas d'erreur
+        if driver is not None:
+            driver.quit()
+
+def scrape_urls(urls, max_workers=SCRAPE_MAX_WORKERS, debug=False):
+    """Scrape plusieurs pages en parallèle (un driver Chrome par page) et fusionne les colonnes"""
+    urls = list(urls)
+    if not urls:
+        return {'title': [], 'price': [], 'image': []}
+    if len(urls) == 1:
+        return scrape_data_with_selenium(urls[0], debug=debug)
+    
+    # Les attentes réseau se recouvrent: durée ~ page la plus lente plutôt que la somme
+    # Un fichier HTML de débogage par page: les threads n'écrivent pas dans le même fichier
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        page_files = [f'page_source_{i}.html' for i in range(len(urls))]
+        pages = list(executor.map(scrape_data_with_selenium, urls, [debug] * len(urls), page_files))
+    
+    # Fusion dans l'ordre des URLs, sans les produits présents sur plusieurs pages
+    titles, prices, images = [], [], []
+    seen = set()
+    for page in pages:
+        for title, price, image in zip(page['title'], page['price'], page['image']):
+            key = (title, price)
+            if key in seen:
+                continue
+            seen.add(key)
+            titles.append(title)
+            prices.append(price)
+            images.append(image)
+    
+    return {'title': titles, 'price': prices, 'image': images}
 
 def scrape_data(url):
     """Scraping simple avec requests (si le site n'utilise pas JavaScript)"""
     response = requests.get(url)
     if response.status_code != 200:
-        return []
+        return {'title': [], 'price': [], 'image': []}
     
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(response.text, 'lxml')
     print(soup.prettify()[:500])  # Pour aider à inspecter la structure HTML
-    articles = []
+    titles, prices, images = [], [], []
     
     # Sélecteurs adaptés pour Marjane.ma
     # Les produits sont généralement dans des divs ou sections spécifiques
-    for item in soup.find_all(['div', 'a'], class_=lambda x: x and ('product' in x.lower() or 'item' in x.lower())):
-        title_elem = item.find(['h2', 'h3', 'h4', 'span', 'p'], class_=lambda x: x and ('title' in x.lower() or 'name' in x.lower()))
+    for item in soup.find_all(['div', 'a'], class_=_SIMPLE_PRODUCT_CLASS_RE):
+        title_elem = item.find(['h2', 'h3', 'h4', 'span', 'p'], class_=_SIMPLE_TITLE_CLASS_RE)
         title = title_elem.text.strip() if title_elem else item.get('title', '')
         
         # Chercher le prix
-        price_elem = item.find(['span', 'div', 'p'], class_=lambda x: x and 'price' in x.lower())
+        price_elem = item.find(['span', 'div', 'p'], class_=_PRICE_CLASS_RE)
         price = price_elem.text.strip() if price_elem else ""
         
         # Chercher l'image
@@ -101,20 +182,18 @@ def scrape_data(url):
         image_url = img.get('src', '') if img else ""
         
         if title:
-            articles.append({
-                'title': title,
-                'price': price,
-                'image': image_url
-            })
+            titles.append(title)
+            prices.append(price)
+            images.append(image_url)
             
-    return articles
+    return {'title': titles, 'price': prices, 'image': images}
 
 # Test
 data = scrape_data_with_selenium('https://www.marjane.ma/')
-print(f"\nNombre d'articles trouvés: {len(data)}")
-for i, article in enumerate(data[:5], 1):  # Afficher les 5 premiers
-    print(f"\n{i}. {article['title']}")
-    if article.get('price'):
-        print(f"   Prix: {article['price']}")
-    if article.get('image'):
-        print(f"   Image: {article['image'][:50]}...")
\ No newline at end of file
+print(f"\nNombre d'articles trouvés: {len(data['title'])}")
+for i, (title, price, image) in enumerate(zip(data['title'][:5], data['price'][:5], data['image'][:5]), 1):  # Afficher les 5 premiers
+    print(f"\n{i}. {title}")
+    if price:
+        print(f"   Prix: {price}")
+    if image:
+        print(f"   Image: {image[:50]}...")
\ No newline at end of file